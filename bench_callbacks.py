@@ -0,0 +1,78 @@
+"""Compare per-update routing cost of the callback router against the old regex handler chain.
+
+Usage: python bench_callbacks.py [iterations]
+"""
+import re
+import sys
+import timeit
+
+import bot
+
+# The handler chain previously registered in main(): one regex per CallbackQueryHandler,
+# tried in order, followed by the handler's own query.data.split("_") parsing.
+LEGACY_CHAIN = [
+    (re.compile(pattern), parse)
+    for pattern, parse in (
+        ("^lang_", lambda data: [data.split("_")[1]]),
+        ("^main_menu$", lambda data: []),
+        ("^shop$", lambda data: []),
+        ("^shop_category_", lambda data: [data.split("_")[-1]]),
+        ("^shop_filter_", lambda data: data.split("_")[2:4]),
+        ("^ads$", lambda data: []),
+        ("^add_ad$", lambda data: []),
+        ("^ad_duration_", lambda data: [int(data.split("_")[2])]),
+        ("^ad_category_", lambda data: [data.split("_")[2]]),
+        ("^ad_region_", lambda data: [data.split("_")[2]]),
+        ("^back$", lambda data: []),
+        ("^shop_top$", lambda data: []),
+    )
+]
+
+# The same button presses in both encodings, weighted towards browsing like real traffic
+TAPS = [
+    ("lang_en", (bot.CB_LANGUAGE, "en")),
+    ("main_menu", (bot.CB_MAIN_MENU,)),
+    ("shop", (bot.CB_SHOP,)),
+    ("shop", (bot.CB_SHOP,)),
+    ("shop_category_real_estate", (bot.CB_CATEGORY, "real_estate")),
+    ("shop_category_transport", (bot.CB_CATEGORY, "transport")),
+    ("shop_filter_transport_toshkent_shahar", (bot.CB_FILTER, "transport", "toshkent_shahar")),
+    ("shop_filter_pets_samarqand", (bot.CB_FILTER, "pets", "samarqand")),
+    ("shop_category_top", (bot.CB_TOP,)),
+    ("ads", (bot.CB_ADS,)),
+    ("add_ad", (bot.CB_ADD_AD,)),
+    ("ad_duration_7", (bot.CB_AD_DURATION, 7)),
+    ("ad_category_home_garden", (bot.CB_AD_CATEGORY, "home_garden")),
+    ("ad_region_fargona", (bot.CB_AD_REGION, "fargona")),
+]
+LEGACY_DATA = [legacy for legacy, _ in TAPS]
+CURRENT_DATA = [bot.encode_callback(*current) for _, current in TAPS]
+
+
+def route_legacy(data):
+    for pattern, parse in LEGACY_CHAIN:
+        if pattern.match(data):
+            return parse(data)
+    return None
+
+
+def run_legacy():
+    for data in LEGACY_DATA:
+        route_legacy(data)
+
+
+def run_current():
+    for data in CURRENT_DATA:
+        bot.resolve_callback(data)
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    updates = iterations * len(TAPS)
+    for name, func in (("regex chain", run_legacy), ("callback router", run_current)):
+        best = min(timeit.repeat(func, number=iterations, repeat=5))
+        print(f"{name:<16} {best / updates * 1e9:8.1f} ns/update")
+
+
+if __name__ == "__main__":
+    main()
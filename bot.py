@@ -1,8 +1,17 @@
+import atexit
+import contextlib
+import contextvars
 import datetime
+import functools
 import sqlite3
 import logging
 import json
 import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
 from telegram import (
     Update,
@@ -21,9 +30,181 @@ from telegram.ext import (
 )
 
 # ---------------- Logging ----------------
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
-)
+
+# Handlers only push records onto a queue; a QueueListener thread formats them as
+# JSON and writes them to stderr, so logging never blocks the event loop.
+LOG_RATE_LIMIT = 5  # WARNING+ records let through per call site per window
+LOG_RATE_WINDOW = 60.0  # seconds
+
+# Set by log_context() so every record logged while handling an update or job carries them
+log_user_id = contextvars.ContextVar("log_user_id", default=None)
+log_handler_name = contextvars.ContextVar("log_handler_name", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as a single JSON line."""
+
+    FIELDS = ("user_id", "handler", "latency_ms", "suppressed")
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class ContextFilter(logging.Filter):
+    """Attach the current user and handler to the record.
+
+    Context variables are only visible in the task that set them, so this filter must
+    sit on the QueueHandler (the emitting thread), never on the QueueListener's handlers.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "user_id", None) is None:
+            record.user_id = log_user_id.get()
+        if getattr(record, "handler", None) is None:
+            record.handler = log_handler_name.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Let at most `limit` WARNING+ records per call site and exception type through
+    every `window` seconds.
+
+    The first record of the next window reports how many were dropped in "suppressed";
+    counts nobody picked up that way are returned by collect_suppressed().
+    """
+
+    def __init__(self, limit: int, window: float):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        # (pathname, lineno, exception type) -> [window start, records passed, records dropped]
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        # python-telegram-bot reports every unhandled handler error from one line,
+        # so the exception type keeps unrelated crashes from sharing a budget
+        exc_type = record.exc_info[0] if record.exc_info else None
+        key = (record.pathname, record.lineno, exc_type)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                if site is not None and site[2]:
+                    record.suppressed = site[2]
+                self._sites[key] = [now, 1, 0]
+                return True
+            if site[1] < self.limit:
+                site[1] += 1
+                return True
+            site[2] += 1
+            return False
+
+    def collect_suppressed(self, final: bool = False) -> dict:
+        """Return and clear drop counts for windows that have ended (or all of them if final)."""
+        now = time.monotonic()
+        collected = {}
+        with self._lock:
+            for key, site in self._sites.items():
+                if site[2] and (final or now - site[0] >= self.window):
+                    collected[key] = site[2]
+                    site[2] = 0
+        return collected
+
+
+log_rate_limiter = RateLimitFilter(LOG_RATE_LIMIT, LOG_RATE_WINDOW)
+
+
+def report_suppressed_logs(final: bool = False) -> None:
+    """Log one summary of records the rate limiter dropped, so drops are never silent."""
+    collected = log_rate_limiter.collect_suppressed(final)
+    if not collected:
+        return
+    sites = ", ".join(
+        f"{os.path.basename(path)}:{lineno}{f' {exc_type.__name__}' if exc_type else ''} x{count}"
+        for (path, lineno, exc_type), count in collected.items()
+    )
+    logging.getLogger(__name__).warning(
+        f"Suppressed repeated log records: {sites}", extra={"suppressed": sum(collected.values())}
+    )
+
+
+async def report_suppressed_logs_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Job callback: report drops from windows that ended without another record."""
+    report_suppressed_logs()
+
+
+@contextlib.contextmanager
+def log_context(handler: str, user_id: Optional[int] = None):
+    """Tag records logged inside the block with the user and handler, then log its latency."""
+    user_token = log_user_id.set(user_id)
+    handler_token = log_handler_name.set(handler)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        logging.getLogger(__name__).info("Handler finished", extra={"latency_ms": latency_ms})
+        log_handler_name.reset(handler_token)
+        log_user_id.reset(user_token)
+
+
+def logged_handler(func):
+    """Run an update handler inside log_context()."""
+    @functools.wraps(func)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args) -> None:
+        user = update.effective_user
+        with log_context(func.__name__, user.id if user else None):
+            await func(update, context, *args)
+    return wrapper
+
+
+def logged_job(func):
+    """Run a job callback inside log_context(), taking the user from the job data if present."""
+    @functools.wraps(func)
+    async def wrapper(context: ContextTypes.DEFAULT_TYPE) -> None:
+        data = context.job.data
+        with log_context(func.__name__, data.get("user_id") if isinstance(data, dict) else None):
+            await func(context)
+    return wrapper
+
+
+def setup_logging() -> QueueListener:
+    """Route all logging through a queue drained by a background writer thread."""
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(log_rate_limiter)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(queue_handler)
+    # httpx logs every getUpdates poll at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)  # flush remaining records on shutdown
+    atexit.register(report_suppressed_logs, final=True)  # atexit is LIFO: runs before stop
+    return listener
+
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # ---------------- CONFIGURATION ----------------
@@ -103,6 +284,11 @@ TIME_OPTIONS = [
     ("1 Month", 30),
 ]
 
+LANGUAGE_CODES = ("uz", "en", "ru")
+CATEGORY_VALUES = frozenset(callback for _, callback in CATEGORIES)
+REGION_VALUES = frozenset(callback for _, callback in REGIONS)
+DURATION_VALUES = frozenset(days for _, days in TIME_OPTIONS)
+
 LANGUAGES = {
     "uz": {
         "choose_language": "Tilni tanlang:",
@@ -221,37 +407,94 @@ LANGUAGES = {
 }
 
 
+# ---------------- CALLBACK DATA ----------------
+
+# Callback data is encoded as "<version>:<action>:<arg>:<arg>...".
+# Values such as "real_estate" contain underscores, so ":" is used as the separator.
+# Bump CALLBACK_VERSION whenever an action or its arguments change; buttons carrying
+# any other version are treated as stale and the user is sent back to the main menu.
+CALLBACK_VERSION = "1"
+CALLBACK_SEP = ":"
+
+# Action codes (kept short, Telegram limits callback data to 64 bytes)
+CB_LANGUAGE = "lang"
+CB_MAIN_MENU = "menu"
+CB_SHOP = "shop"
+CB_TOP = "top"
+CB_CATEGORY = "cat"
+CB_FILTER = "filt"
+CB_ADS = "ads"
+CB_ADD_AD = "add"
+CB_AD_DURATION = "dur"
+CB_AD_CATEGORY = "acat"
+CB_AD_REGION = "areg"
+CB_BACK = "back"
+
+
+def encode_callback(action: str, *args) -> str:
+    """Build callback data for an inline button."""
+    return CALLBACK_SEP.join((CALLBACK_VERSION, action, *map(str, args)))
+
+
+def decode_callback(data: str) -> Optional[tuple]:
+    """Split callback data into (action, args). Returns None for stale or malformed data."""
+    parts = data.split(CALLBACK_SEP)
+    if len(parts) < 2 or parts[0] != CALLBACK_VERSION:
+        return None
+    return parts[1], parts[2:]
+
+
+def _choice(values):
+    """Make an argument parser that only accepts one of the given values."""
+    def parse(value: str) -> str:
+        if value not in values:
+            raise ValueError(f"unexpected callback value: {value!r}")
+        return value
+    return parse
+
+
+parse_language = _choice(LANGUAGE_CODES)
+parse_category = _choice(CATEGORY_VALUES)
+parse_region = _choice(REGION_VALUES)
+
+
+def parse_duration(value: str) -> int:
+    days = int(value)
+    if days not in DURATION_VALUES:
+        raise ValueError(f"unexpected ad duration: {days}")
+    return days
+
 
 # ---------------- HELPER FUNCTION TO SEND MAIN MENU ----------------
 
 async def send_main_menu_for_chat(chat_id: int, user_id: int, context: ContextTypes.DEFAULT_TYPE):
     keyboard = [
-        [InlineKeyboardButton("🛍 Shop", callback_data="shop")],
-        [InlineKeyboardButton("📢 Ads", callback_data="ads")],
+        [InlineKeyboardButton("🛍 Shop", callback_data=encode_callback(CB_SHOP))],
+        [InlineKeyboardButton("📢 Ads", callback_data=encode_callback(CB_ADS))],
     ]
     if user_id in ADMIN_IDS:
-        keyboard.append([InlineKeyboardButton("➕ Add Ad", callback_data="add_ad")])
+        keyboard.append([InlineKeyboardButton("➕ Add Ad", callback_data=encode_callback(CB_ADD_AD))])
     reply_markup = InlineKeyboardMarkup(keyboard)
     await context.bot.send_message(chat_id, "Welcome! Choose an option:", reply_markup=reply_markup)
 
 
 # ---------------- HANDLERS ----------------
 
+@logged_handler
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Ask the user to choose a language before showing the main menu."""
     user = update.effective_user
     keyboard = [
-        [InlineKeyboardButton("O'zbekcha", callback_data="lang_uz")],
-        [InlineKeyboardButton("English", callback_data="lang_en")],
-        [InlineKeyboardButton("Русский", callback_data="lang_ru")],
+        [InlineKeyboardButton("O'zbekcha", callback_data=encode_callback(CB_LANGUAGE, "uz"))],
+        [InlineKeyboardButton("English", callback_data=encode_callback(CB_LANGUAGE, "en"))],
+        [InlineKeyboardButton("Русский", callback_data=encode_callback(CB_LANGUAGE, "ru"))],
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     await update.message.reply_text("Choose your language / Tilni tanlang / Выберите язык:", reply_markup=reply_markup)
 
 
-async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE, selected_lang: str) -> None:
     query = update.callback_query
-    selected_lang = query.data.split("_")[1]  # Extract selected language (e.g., "uz", "en", "ru")
     context.user_data["lang"] = selected_lang  # Save the language in user data
     await query.answer()
     await show_main_menu(update, context)
@@ -261,11 +504,11 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     lang = context.user_data.get("lang", "en")  # Default to English if no language is set
     messages = LANGUAGES[lang]
     keyboard = [
-        [InlineKeyboardButton(messages["shop"], callback_data="shop")],
-        [InlineKeyboardButton(messages["ads"], callback_data="ads")],
+        [InlineKeyboardButton(messages["shop"], callback_data=encode_callback(CB_SHOP))],
+        [InlineKeyboardButton(messages["ads"], callback_data=encode_callback(CB_ADS))],
     ]
     if update.effective_user.id in ADMIN_IDS:
-        keyboard.append([InlineKeyboardButton("➕ Add Ad", callback_data="add_ad")])
+        keyboard.append([InlineKeyboardButton("➕ Add Ad", callback_data=encode_callback(CB_ADD_AD))])
     reply_markup = InlineKeyboardMarkup(keyboard)
     text = messages["main_menu"]
     if update.callback_query:
@@ -277,11 +520,11 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Helper function to send the main menu (for callback queries)."""
     keyboard = [
-        [InlineKeyboardButton("🛍 Shop", callback_data="shop")],
-        [InlineKeyboardButton("📢 Ads", callback_data="ads")],
+        [InlineKeyboardButton("🛍 Shop", callback_data=encode_callback(CB_SHOP))],
+        [InlineKeyboardButton("📢 Ads", callback_data=encode_callback(CB_ADS))],
     ]
     if update.effective_user.id in ADMIN_IDS:
-        keyboard.append([InlineKeyboardButton("➕ Add Ad", callback_data="add_ad")])
+        keyboard.append([InlineKeyboardButton("➕ Add Ad", callback_data=encode_callback(CB_ADD_AD))])
     reply_markup = InlineKeyboardMarkup(keyboard)
     if update.callback_query:
         await update.callback_query.message.edit_text("Welcome! Choose an option:", reply_markup=reply_markup)
@@ -292,21 +535,20 @@ async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 # ----- SHOP & CATEGORY HANDLERS -----
 
 
-async def show_category_regions(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def show_category_regions(update: Update, context: ContextTypes.DEFAULT_TYPE, selected_category: str) -> None:
     query = update.callback_query
     lang = context.user_data.get("lang", "en")  # Default to English
     messages = LANGUAGES[lang]
     await query.answer()
 
-    selected_category = query.data.split("_")[-1]
     context.user_data["selected_category"] = selected_category
 
     keyboard = [
         [InlineKeyboardButton(messages["regions"][callback],
-                              callback_data=f"shop_filter_{selected_category}_{callback}")]
+                              callback_data=encode_callback(CB_FILTER, selected_category, callback))]
         for _, callback in REGIONS
     ]
-    keyboard.append([InlineKeyboardButton(messages["back"], callback_data="shop")])
+    keyboard.append([InlineKeyboardButton(messages["back"], callback_data=encode_callback(CB_SHOP))])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     await query.message.edit_text(messages["shop"], reply_markup=reply_markup)
@@ -317,10 +559,14 @@ async def shop_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     messages = LANGUAGES[lang]
     categories = CATEGORIES
     keyboard = [
-        [InlineKeyboardButton(messages["categories"][callback], callback_data=f"shop_category_{callback}")]
+        [InlineKeyboardButton(
+            messages["categories"][callback],
+            # The top section lists the newest ads from every category, not a region picker
+            callback_data=encode_callback(CB_TOP) if callback == "top" else encode_callback(CB_CATEGORY, callback),
+        )]
         for _, callback in categories
     ]
-    keyboard.append([InlineKeyboardButton(messages["back"], callback_data="main_menu")])
+    keyboard.append([InlineKeyboardButton(messages["back"], callback_data=encode_callback(CB_MAIN_MENU))])
     reply_markup = InlineKeyboardMarkup(keyboard)
     await update.callback_query.message.edit_text(messages["shop"], reply_markup=reply_markup)
 
@@ -338,7 +584,7 @@ async def show_top_ads(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     rows = cursor.fetchall()
 
     if not rows:
-        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="shop")]]
+        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data=encode_callback(CB_SHOP))]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         await query.message.edit_text("❌ Нет топовых объявлений.", reply_markup=reply_markup)
         return
@@ -361,24 +607,17 @@ async def show_top_ads(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         except Exception as e:
             logger.error(f"Ошибка отправки медиа-группы: {e}")
 
-    keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="shop")]]
+    keyboard = [[InlineKeyboardButton("🔙 Back", callback_data=encode_callback(CB_SHOP))]]
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.reply_text("🔙 Назад", reply_markup=reply_markup)
 
 
-async def show_filtered_ads(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def show_filtered_ads(update: Update, context: ContextTypes.DEFAULT_TYPE, selected_category: str,
+                            selected_region: str) -> None:
     """Display ads filtered by selected category and region."""
     query = update.callback_query
     await query.answer()
 
-    # Extract category and region from callback data
-    parts = query.data.split("_")  # Example: shop_filter_work_urban
-    if len(parts) < 4:
-        await query.message.edit_text("⚠️ Error: Invalid selection. Please try again.")
-        return
-
-    selected_category = parts[2]  # "work"
-    selected_region = parts[3]  # "urban"
     now_iso = datetime.datetime.now().isoformat()
 
     # Fetch ads matching both category and region
@@ -390,7 +629,7 @@ async def show_filtered_ads(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     # Handle cases with no ads
     if not rows:
-        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="shop")]]
+        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data=encode_callback(CB_SHOP))]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         await query.message.edit_text(
             "❌ No ads found for your selection. Try a different region or category.",
@@ -424,7 +663,7 @@ async def show_filtered_ads(update: Update, context: ContextTypes.DEFAULT_TYPE)
             logger.error(f"Error sending media group: {e}")
 
     # Add a Back button
-    keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="shop")]]
+    keyboard = [[InlineKeyboardButton("🔙 Back", callback_data=encode_callback(CB_SHOP))]]
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.reply_text("🔙 Back to Shop", reply_markup=reply_markup)
 
@@ -437,7 +676,7 @@ async def ads_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
     text = messages["contact_admin"]
-    keyboard = [[InlineKeyboardButton(messages["back"], callback_data="main_menu")]]
+    keyboard = [[InlineKeyboardButton(messages["back"], callback_data=encode_callback(CB_MAIN_MENU))]]
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.edit_text(text, reply_markup=reply_markup)
 
@@ -451,68 +690,52 @@ async def add_ad(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if update.effective_user.id not in ADMIN_IDS:
         return
     keyboard = [
-        [InlineKeyboardButton(text, callback_data=f"ad_duration_{days}")]
+        [InlineKeyboardButton(text, callback_data=encode_callback(CB_AD_DURATION, days))]
         for text, days in TIME_OPTIONS
     ]
-    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data="main_menu")])
+    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data=encode_callback(CB_MAIN_MENU))])
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.edit_text("🕒 Select ad duration:", reply_markup=reply_markup)
 
 
-async def set_ad_duration(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def set_ad_duration(update: Update, context: ContextTypes.DEFAULT_TYPE, duration: int) -> None:
     """Store the selected duration and prompt for category."""
     query = update.callback_query
     await query.answer()
-    try:
-        duration = int(query.data.split("_")[2])
-    except (IndexError, ValueError):
-        return
     admin_params[update.effective_user.id] = {"ad_duration": duration}
     keyboard = [
-        [InlineKeyboardButton(text, callback_data=f"ad_category_{callback}")]
+        [InlineKeyboardButton(text, callback_data=encode_callback(CB_AD_CATEGORY, callback))]
         for text, callback in CATEGORIES
     ]
-    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data="add_ad")])
+    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data=encode_callback(CB_ADD_AD))])
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.edit_text("📂 Select category for your ad:", reply_markup=reply_markup)
 
 
-async def set_ad_category(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def set_ad_category(update: Update, context: ContextTypes.DEFAULT_TYPE, category: str) -> None:
     """Store the selected category and prompt admin to select region."""
     query = update.callback_query
     await query.answer()
 
-    try:
-        category = query.data.split("_")[2]
-    except IndexError:
-        return
-
     if update.effective_user.id not in admin_params:
         admin_params[update.effective_user.id] = {}
     admin_params[update.effective_user.id]["ad_category"] = category
 
     # Prompt the admin to select a region
     keyboard = [
-        [InlineKeyboardButton(text, callback_data=f"ad_region_{callback}")]
+        [InlineKeyboardButton(text, callback_data=encode_callback(CB_AD_REGION, callback))]
         for text, callback in REGIONS
     ]
-    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data="add_ad")])
+    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data=encode_callback(CB_ADD_AD))])
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.message.edit_text("📍 Select region for your ad:", reply_markup=reply_markup)
 
 
-async def set_ad_region(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def set_ad_region(update: Update, context: ContextTypes.DEFAULT_TYPE, selected_region: str) -> None:
     """Store the selected region and prompt the admin to send the post for the ad."""
     query = update.callback_query
     await query.answer()
 
-    try:
-        # Extract the selected region from the callback query data
-        selected_region = query.data.split("_")[2]
-    except IndexError:
-        await query.message.edit_text("⚠️ Failed to get the selected region. Please try again.")
-        return
-
     user_id = update.effective_user.id
 
     # Check if we've already initialized admin parameters
@@ -531,6 +754,7 @@ async def set_ad_region(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
 # ----- RECEIVING THE AD POST (WITH MEDIA GROUP SUPPORT & HANDLING MIXED TYPES) -----
 
+@logged_handler
 async def receive_ad_post(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Receive the ad post from the admin and store it."""
     user = update.effective_user
@@ -568,6 +792,7 @@ async def receive_ad_post(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await store_ad(user.id, media_items, media_type, caption, update, context)
 
 
+@logged_job
 async def process_media_group(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Job callback to process an accumulated media group."""
     job_data = context.job.data
@@ -604,6 +829,7 @@ async def process_media_group(context: ContextTypes.DEFAULT_TYPE) -> None:
     await send_main_menu_for_chat(chat_id, user_id, context)
 
 
+@logged_job
 async def delete_expired_ads(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Delete ads that have reached their time limit."""
     now_iso = datetime.datetime.now().isoformat()
@@ -659,6 +885,62 @@ async def back_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await main_menu(update, context)
 
 
+# ---------------- CALLBACK ROUTER ----------------
+
+# Action code -> (handler, argument parsers). Parsed arguments are passed to the
+# handler positionally after (update, context).
+CALLBACK_ROUTES = {
+    CB_LANGUAGE: (set_language, (parse_language,)),
+    CB_MAIN_MENU: (show_main_menu, ()),
+    CB_SHOP: (shop_menu, ()),
+    CB_TOP: (show_top_ads, ()),
+    CB_CATEGORY: (show_category_regions, (parse_category,)),
+    CB_FILTER: (show_filtered_ads, (parse_category, parse_region)),
+    CB_ADS: (ads_info, ()),
+    CB_ADD_AD: (add_ad, ()),
+    CB_AD_DURATION: (set_ad_duration, (parse_duration,)),
+    CB_AD_CATEGORY: (set_ad_category, (parse_category,)),
+    CB_AD_REGION: (set_ad_region, (parse_region,)),
+    CB_BACK: (back_handler, ()),
+}
+
+
+def resolve_callback(data: str) -> Optional[tuple]:
+    """Map callback data to (handler, parsed args), or None if it can't be routed."""
+    decoded = decode_callback(data)
+    if decoded is None:
+        return None
+    action, args = decoded
+    route = CALLBACK_ROUTES.get(action)
+    if route is None:
+        return None
+    handler, parsers = route
+    if len(args) != len(parsers):
+        return None
+    try:
+        return handler, [parse(arg) for parse, arg in zip(parsers, args)]
+    except ValueError:
+        return None
+
+
+async def route_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Single entry point for all inline button presses."""
+    query = update.callback_query
+    resolved = resolve_callback(query.data or "")
+    if resolved is None:
+        # Stale button from an older keyboard or tampered data: show a fresh menu
+        handler, args = show_main_menu, []
+    else:
+        handler, args = resolved
+
+    user = update.effective_user
+    with log_context(handler.__name__, user.id if user else None):
+        if resolved is None:
+            logger.warning(f"Unroutable callback data: {query.data!r}")
+            await query.answer()
+        await handler(update, context, *args)
+
+
 # ---------------- MAIN FUNCTION ----------------
 
 def main() -> None:
@@ -667,20 +949,10 @@ def main() -> None:
     # Command handler
     app.add_handler(CommandHandler("start", start))
 
-    # CallbackQuery handlers
-    app.add_handler(CallbackQueryHandler(set_language, pattern="^lang_"))
-    app.add_handler(CallbackQueryHandler(show_main_menu, pattern="^main_menu$"))
-    app.add_handler(CallbackQueryHandler(shop_menu, pattern="^shop$"))
-    app.add_handler(CallbackQueryHandler(show_category_regions, pattern="^shop_category_"))
-    app.add_handler(CallbackQueryHandler(show_filtered_ads, pattern="^shop_filter_"))
-    app.add_handler(CallbackQueryHandler(ads_info, pattern="^ads$"))
-    app.add_handler(CallbackQueryHandler(add_ad, pattern="^add_ad$"))
-    app.add_handler(CallbackQueryHandler(set_ad_duration, pattern="^ad_duration_"))
-    app.add_handler(CallbackQueryHandler(set_ad_category, pattern="^ad_category_"))
-    app.add_handler(CallbackQueryHandler(set_ad_region, pattern="^ad_region_"))
-    app.add_handler(CallbackQueryHandler(back_handler, pattern="^back$"))
-    app.add_handler(CallbackQueryHandler(show_top_ads, pattern="^shop_top$"))
+    # CallbackQuery handler (all inline buttons, see CALLBACK_ROUTES)
+    app.add_handler(CallbackQueryHandler(route_callback))
     app.job_queue.run_repeating(delete_expired_ads, interval=3600, first=10)
+    app.job_queue.run_repeating(report_suppressed_logs_job, interval=LOG_RATE_WINDOW, first=LOG_RATE_WINDOW)
 
     # Message handler for receiving ad posts (photos/videos, including media groups)
     app.add_handler(MessageHandler(filters.PHOTO | filters.VIDEO, receive_ad_post))